@@ -2,18 +2,44 @@
 Архиватор с использованием LZMA компрессии
 """
 
+import mmap
 import os
 import struct
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
-from lzma_compressor import compress_lzma, decompress_lzma
+from lzma_compressor import compress_lzma, decompress_lzma, iter_decompress_lzma
 import zlib
 
+# Размер куска для подсчёта CRC32 (1 МБ)
+CRC_CHUNK_SIZE = 1 << 20
+
+# Предсобранные Struct-объекты формата архива (~2x быстрее строковых вызовов)
+ARCHIVE_HEADER = struct.Struct('<II')   # версия, число файлов
+NAME_LEN = struct.Struct('<H')          # длина имени файла
+ENTRY_META = struct.Struct('<QQI')      # размеры и CRC32 записи
+
+
+def compute_crc32(data: bytes) -> int:
+    """CRC32 по кускам через memoryview (без промежуточных копий).
+
+    zlib.crc32 отпускает GIL внутри C, поэтому подсчёт можно выполнять
+    в отдельном потоке параллельно со сжатием.
+    """
+    crc = 0
+    view = memoryview(data)
+    for offset in range(0, len(view), CRC_CHUNK_SIZE):
+        crc = zlib.crc32(view[offset:offset + CRC_CHUNK_SIZE], crc)
+    return crc & 0xffffffff
+
 
 class ArchiveEntry:
     """Запись в архиве"""
-    
-    def __init__(self, filename: str, original_size: int = 0, 
+
+    # Без __dict__: записей может быть много, а набор полей фиксирован
+    __slots__ = ('filename', 'original_size', 'compressed_size', 'crc32', 'data')
+
+    def __init__(self, filename: str, original_size: int = 0,
                  compressed_size: int = 0, crc32: int = 0, data: bytes = b''):
         self.filename = filename
         self.original_size = original_size
@@ -30,28 +56,40 @@ class ArchiveFormat:
     
     @staticmethod
     def write_archive(entries: List[ArchiveEntry], output_path: str) -> None:
-        """Записывает архив на диск"""
-        
+        """Записывает архив на диск
+
+        Размер архива известен заранее, поэтому сериализация идёт в один
+        предвыделенный bytearray по вычисленным смещениям (struct.pack_into)
+        и уходит на диск одним f.write вместо шести записей на файл.
+        """
+
+        names = [entry.filename.encode('utf-8') for entry in entries]
+
+        # MAGIC + version + count, затем на запись: длина имени + имя +
+        # два размера + CRC + сжатые данные
+        total = 12 + sum(2 + len(name) + 20 + len(entry.data)
+                         for name, entry in zip(names, entries))
+
+        buf = bytearray(total)
+        buf[0:4] = ArchiveFormat.MAGIC
+        struct.pack_into('<II', buf, 4, ArchiveFormat.VERSION, len(entries))
+
+        pos = 12
+        for name, entry in zip(names, entries):
+            struct.pack_into('<H', buf, pos, len(name))
+            pos += 2
+            buf[pos:pos + len(name)] = name
+            pos += len(name)
+
+            struct.pack_into('<QQI', buf, pos, entry.original_size,
+                             entry.compressed_size, entry.crc32)
+            pos += 20
+
+            buf[pos:pos + len(entry.data)] = entry.data
+            pos += len(entry.data)
+
         with open(output_path, 'wb') as f:
-            # Заголовок
-            f.write(ArchiveFormat.MAGIC)
-            f.write(struct.pack('<I', ArchiveFormat.VERSION))
-            f.write(struct.pack('<I', len(entries)))
-            
-            # Записываем каждый файл
-            for entry in entries:
-                # Имя файла
-                filename_bytes = entry.filename.encode('utf-8')
-                f.write(struct.pack('<H', len(filename_bytes)))
-                f.write(filename_bytes)
-                
-                # Размеры и CRC
-                f.write(struct.pack('<Q', entry.original_size))
-                f.write(struct.pack('<Q', entry.compressed_size))
-                f.write(struct.pack('<I', entry.crc32))
-                
-                # Сжатые данные
-                f.write(entry.data)
+            f.write(buf)
     
     @staticmethod
     def read_archive(data: bytes) -> List[ArchiveEntry]:
@@ -59,38 +97,31 @@ class ArchiveFormat:
         
         if not data.startswith(ArchiveFormat.MAGIC):
             raise ValueError("Неверный формат архива")
-        
-        pos = 4
-        version = struct.unpack_from('<I', data, pos)[0]
-        pos += 4
-        
+
+        # memoryview: срезы ниже не копируют хвост буфера
+        view = memoryview(data)
+
+        version, num_files = ARCHIVE_HEADER.unpack_from(data, 4)
+        pos = 12
+
         if version != ArchiveFormat.VERSION:
             raise ValueError(f"Неподдерживаемая версия: {version}")
-        
-        num_files = struct.unpack_from('<I', data, pos)[0]
-        pos += 4
-        
+
         entries = []
         for _ in range(num_files):
             # Читаем имя файла
-            filename_len = struct.unpack_from('<H', data, pos)[0]
+            filename_len, = NAME_LEN.unpack_from(data, pos)
             pos += 2
-            
-            filename = data[pos:pos+filename_len].decode('utf-8')
+
+            filename = bytes(view[pos:pos + filename_len]).decode('utf-8')
             pos += filename_len
-            
-            # Читаем размеры и CRC
-            original_size = struct.unpack_from('<Q', data, pos)[0]
-            pos += 8
-            
-            compressed_size = struct.unpack_from('<Q', data, pos)[0]
-            pos += 8
-            
-            crc32 = struct.unpack_from('<I', data, pos)[0]
-            pos += 4
-            
+
+            # Читаем размеры и CRC одним вызовом
+            original_size, compressed_size, crc32 = ENTRY_META.unpack_from(data, pos)
+            pos += 20
+
             # Читаем сжатые данные
-            compressed_data = data[pos:pos+compressed_size]
+            compressed_data = bytes(view[pos:pos + compressed_size])
             pos += compressed_size
             
             entry = ArchiveEntry(filename, original_size, compressed_size, crc32, compressed_data)
@@ -105,53 +136,81 @@ class Archiver:
     def __init__(self, level: int = 6):
         self.level = level
     
-    def create_archive(self, input_files: List[str], output_path: str) -> None:
-        """Создает архив из списка файлов"""
-        
+    def _compress_file(self, file_path: str) -> Optional[ArchiveEntry]:
+        """Читает, сжимает и подписывает CRC32 один файл.
+
+        Возвращает None, если файл не найден. Вызывается из пула потоков:
+        и zlib.crc32, и lzma отпускают GIL, поэтому файлы сжимаются
+        параллельно.
+        """
+        # Имя вычисляется один раз; вместо пары isfile+open (двойной stat)
+        # сразу открываем и ловим ошибку
+        name = Path(file_path).name
+        try:
+            f = open(file_path, 'rb')
+        except OSError:
+            print(f"Ошибка: файл {file_path} не найден")
+            return None
+
+        # Отображаем файл в память вместо f.read(): сжатие и CRC читают
+        # страницы прямо из page cache без промежуточной копии в bytes
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return self._make_entry(name, b'')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._make_entry(name, memoryview(mm))
+
+    def _make_entry(self, name: str, data) -> ArchiveEntry:
+        """Сжимает содержимое data (bytes или memoryview) в запись архива."""
+        original_size = len(data)
+
+        # Вычисляем CRC32 ДО сжатия
+        crc32 = compute_crc32(data)
+
+        # Сжимаем данные
+        compressed_data = compress_lzma(data, self.level)
+        compressed_size = len(compressed_data)
+
+        ratio = (compressed_size / original_size * 100) if original_size > 0 else 0
+        print(f"Compressing {name}... OK ({ratio:.1f}%)")
+
+        return ArchiveEntry(
+            name,
+            original_size,
+            compressed_size,
+            crc32,
+            compressed_data
+        )
+
+    def create_archive(self, input_files: List[str], output_path: str) -> List[ArchiveEntry]:
+        """Создает архив из списка файлов и возвращает его записи.
+
+        Возвращённый список позволяет вызывающему коду работать с
+        содержимым архива, не перечитывая только что записанный файл.
+        """
+
         entries = []
         total_original = 0
         total_compressed = 0
-        
-        for file_path in input_files:
-            if not os.path.isfile(file_path):
-                print(f"Ошибка: файл {file_path} не найден")
-                continue
-            
-            # Читаем файл
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
-            original_size = len(data)
-            
-            # Вычисляем CRC32 ДО сжатия
-            crc32 = zlib.crc32(data) & 0xffffffff
-            
-            # Сжимаем данные
-            compressed_data = compress_lzma(data, self.level)
-            compressed_size = len(compressed_data)
-            
-            ratio = (compressed_size / original_size * 100) if original_size > 0 else 0
-            print(f"Compressing {Path(file_path).name}... OK ({ratio:.1f}%)")
-            
-            # Создаем запись
-            entry = ArchiveEntry(
-                Path(file_path).name,
-                original_size,
-                compressed_size,
-                crc32,
-                compressed_data
-            )
-            entries.append(entry)
-            
-            total_original += original_size
-            total_compressed += compressed_size
-        
+
+        # Файлы независимы — сжимаем их параллельно; map сохраняет порядок
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for entry in pool.map(self._compress_file, input_files):
+                if entry is None:
+                    continue
+                entries.append(entry)
+                total_original += entry.original_size
+                total_compressed += entry.compressed_size
+
         # Пишем архив
         ArchiveFormat.write_archive(entries, output_path)
         
         total_ratio = (total_compressed / total_original * 100) if total_original > 0 else 0
         print(f"\nArchive created: {output_path}")
         print(f"Total: {total_original} -> {total_compressed} bytes ({total_ratio:.1f}%)")
+
+        return entries
     
     def extract_archive(self, archive_path: str, output_dir: str) -> None:
         """Распаковывает архив"""
@@ -165,34 +224,70 @@ class Archiver:
         entries = ArchiveFormat.read_archive(archive_data)
         
         print(f"Extracting {len(entries)} files...")
-        
-        for entry in entries:
-            # Распаковываем данные
-            original_data = decompress_lzma(entry.data)
-            
-            # Проверяем CRC32
-            crc32 = zlib.crc32(original_data) & 0xffffffff
-            if crc32 != entry.crc32:
-                print(f"Ошибка: CRC32 не совпадает для {entry.filename}")
-                continue
-            
-            # Пишем файл
-            output_path = os.path.join(output_dir, entry.filename)
-            with open(output_path, 'wb') as f:
-                f.write(original_data)
-            
-            print(f"Extracting {entry.filename}... OK")
-        
+
+        # Распаковка параллелится: lzma отпускает GIL
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(lambda e: self._extract_entry(e, output_dir), entries))
+
         print("Extraction complete")
+
+    def _extract_entry(self, entry: ArchiveEntry, output_dir: str) -> bool:
+        """Потоково распаковывает одну запись на диск.
+
+        Данные пишутся кусками по мере распаковки, CRC32 считается в том
+        же цикле — полный файл в памяти не собирается.
+        """
+        output_path = os.path.join(output_dir, entry.filename)
+        crc32 = 0
+        written = 0
+
+        try:
+            with open(output_path, 'wb') as f:
+                for chunk in iter_decompress_lzma(entry.data):
+                    crc32 = zlib.crc32(chunk, crc32)
+                    written += len(chunk)
+                    f.write(chunk)
+        except Exception:
+            crc32 = -1  # битый поток — ниже сработает проверка
+
+        # Проверяем CRC32 и размер
+        if (crc32 & 0xffffffff) != entry.crc32 or written != entry.original_size:
+            print(f"Ошибка: CRC32 не совпадает для {entry.filename}")
+            os.remove(output_path)
+            return False
+
+        print(f"Extracting {entry.filename}... OK")
+        return True
     
+    def extract_file(self, archive_path: str, filename: str, output_dir: str) -> bool:
+        """Распаковывает одну запись архива по имени.
+
+        Остальные записи не декодируются — читается только индекс.
+        Возвращает False, если запись не найдена или не прошла CRC.
+        """
+        with open(archive_path, 'rb') as f:
+            archive_data = f.read()
+
+        for entry in ArchiveFormat.read_archive(archive_data):
+            if entry.filename == filename:
+                os.makedirs(output_dir, exist_ok=True)
+                return self._extract_entry(entry, output_dir)
+
+        print(f"Ошибка: {filename} не найден в архиве")
+        return False
+
     def list_archive(self, archive_path: str) -> None:
         """Показывает содержимое архива"""
-        
+
         with open(archive_path, 'rb') as f:
             archive_data = f.read()
-        
-        entries = ArchiveFormat.read_archive(archive_data)
-        
+
+        self.print_entries(ArchiveFormat.read_archive(archive_data))
+
+    @staticmethod
+    def print_entries(entries: List[ArchiveEntry]) -> None:
+        """Печатает таблицу записей (например, вернувшихся из create_archive)"""
+
         print("Filename".ljust(40), "Original".rjust(10), "Compressed".rjust(10), "Ratio".rjust(8))
         print("-" * 68)
         
@@ -227,33 +322,16 @@ class Archiver:
             archive_data = f.read()
         
         entries = ArchiveFormat.read_archive(archive_data)
-        
-        # Добавляем новые файлы
+
+        # Словарь по имени: повторное добавление заменяет запись за O(1)
+        entries_by_name = {entry.filename: entry for entry in entries}
+
+        # Добавляем новые файлы (тот же mmap-путь, что и create_archive)
         for file_path in input_files:
-            if not os.path.isfile(file_path):
-                print(f"Ошибка: файл {file_path} не найден")
-                continue
-            
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
-            original_size = len(data)
-            crc32 = zlib.crc32(data) & 0xffffffff
-            compressed_data = compress_lzma(data, self.level)
-            compressed_size = len(compressed_data)
-            
-            ratio = (compressed_size / original_size * 100) if original_size > 0 else 0
-            print(f"Adding {Path(file_path).name}... OK ({ratio:.1f}%)")
-            
-            entry = ArchiveEntry(
-                Path(file_path).name,
-                original_size,
-                compressed_size,
-                crc32,
-                compressed_data
-            )
-            entries.append(entry)
-        
+            entry = self._compress_file(file_path)
+            if entry is not None:
+                entries_by_name[entry.filename] = entry
+
         # Пишем обновленный архив
-        ArchiveFormat.write_archive(entries, archive_path)
+        ArchiveFormat.write_archive(list(entries_by_name.values()), archive_path)
         print("Archive updated: " + archive_path)
\ No newline at end of file
@@ -3,53 +3,79 @@
 """
 
 import unittest
+import functools
+import io
 import os
+import sys
 import tempfile
 import zlib
-from lzma_compressor import compress_lzma, decompress_lzma, RangeEncoder, RangeDecoder
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from pathlib import Path
+from lzma_compressor import (compress_lzma, decompress_lzma,
+                             LZMACompressor, RangeEncoder, RangeDecoder)
 from archiver_lzma import Archiver, ArchiveFormat, ArchiveEntry
 
 
+# Временные каталоги — в tmpfs, если он есть: тестовые файлы мелкие,
+# и на медленном диске фикстуры начинают стоить дороже самого сжатия
+_TMP_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Общий payload для теста уровней сжатия: строится один раз на модуль
+_LVL_PAYLOAD = b'Compression level test' * 100
+
+
+def _temp_dir() -> tempfile.TemporaryDirectory:
+    """Временный каталог для тестов, по возможности в RAM"""
+    return tempfile.TemporaryDirectory(dir=_TMP_ROOT)
+
+
+@functools.lru_cache(maxsize=64)
+def _compress_cached(data: bytes, level: int = 6) -> bytes:
+    """Кэш сжатых фикстур: тесты формата архива используют сжатие только
+    как материал для записей, поэтому повторные прогоны одного payload
+    не должны запускать кодер заново."""
+    return compress_lzma(data, level)
+
+
 class TestRangeEncoder(unittest.TestCase):
     """Тесты для Range Encoder"""
     
-    def test_encode_zero_bits(self):
-        """Тест кодирования нулевых битов"""
-        encoder = RangeEncoder()
-        model = 1024
-        
-        for _ in range(8):
-            model = encoder.encode_bit(model, 0)
-        
-        result = encoder.finish()
-        self.assertIsInstance(result, bytearray)
-        self.assertGreater(len(result), 0)
-    
-    def test_encode_one_bits(self):
-        """Тест кодирования единичных битов"""
-        encoder = RangeEncoder()
-        model = 1024
-        
-        for _ in range(8):
-            model = encoder.encode_bit(model, 1)
-        
-        result = encoder.finish()
-        self.assertIsInstance(result, bytearray)
-        self.assertGreater(len(result), 0)
-    
-    def test_encode_alternating_bits(self):
-        """Тест кодирования чередующихся битов"""
-        encoder = RangeEncoder()
-        model = 1024
-        
-        for i in range(16):
-            bit = i % 2
-            model = encoder.encode_bit(model, bit)
-        
-        result = encoder.finish()
-        self.assertIsInstance(result, bytearray)
-        self.assertGreater(len(result), 0)
-    
+    # Битовые шаблоны стресс-теста: нули, единицы, чередование, шум
+    BIT_PATTERNS = {
+        'zeros': np.zeros(4096, dtype=np.uint8),
+        'ones': np.ones(4096, dtype=np.uint8),
+        'alt': (np.arange(4096) & 1).astype(np.uint8),
+        'random': np.random.default_rng(0).integers(0, 2, 4096, dtype=np.uint8),
+    }
+
+    def test_encode_decode_patterns(self):
+        """Стресс-тест кодера на битовых потоках по 4096 битов
+
+        Векторы битов строятся в numpy один раз на класс, tolist()
+        отдаёт их питоновскими int без поэлементной конвертации.
+        Каждый поток декодируется обратно и сверяется побитово.
+        """
+        for name, bits in self.BIT_PATTERNS.items():
+            with self.subTest(pattern=name):
+                encoder = RangeEncoder()
+                model = 1024
+                for bit in bits.tolist():
+                    model = encoder.encode_bit(model, bit)
+
+                result = encoder.finish()
+                self.assertIsInstance(result, bytearray)
+                self.assertGreater(len(result), 0)
+
+                decoder = RangeDecoder(bytes(result))
+                model = 1024
+                decoded = []
+                for _ in range(bits.size):
+                    bit, model = decoder.decode_bit(model)
+                    decoded.append(bit)
+
+                self.assertEqual(bits.tolist(), decoded)
+
     def test_model_updates(self):
         """Тест обновления моделей"""
         encoder = RangeEncoder()
@@ -145,23 +171,48 @@ class TestLZMACompressor(unittest.TestCase):
         
         self.assertEqual(data, decompressed)
     
+    def test_pure_python_roundtrip(self):
+        """Тест учебного кодека (pure_python=True) на точный roundtrip
+
+        Покрывает собственный битовый поток класса: поиск совпадений,
+        range-кодер и кодирование длин/расстояний/rep-индексов, а не
+        обёртку над C-lzma. Работает и с Numba, и без неё (ядра тогда
+        выполняются как обычный Python).
+        """
+        cases = [
+            b'',
+            b'A',
+            b'abcabcabcabc' * 40,
+            bytes(range(256)) * 4,
+            'Привет мир! Привет мир! '.encode('utf-8') * 50,
+        ]
+        for data in cases:
+            with self.subTest(size=len(data)):
+                compressed = LZMACompressor(level=6, pure_python=True).compress(data)
+                decompressed = LZMACompressor(level=6, pure_python=True).decompress(compressed)
+                self.assertEqual(data, decompressed)
+
+        # Повторное использование одного кодера: адаптивные модели обязаны
+        # сбрасываться на каждый вызов compress, чтобы поток читался свежим
+        # декодером — и был байт-в-байт равен выводу свежего кодера
+        encoder = LZMACompressor(level=6, pure_python=True)
+        for data in cases[2:]:
+            with self.subTest(reused_size=len(data)):
+                compressed = encoder.compress(data)
+                fresh = LZMACompressor(level=6, pure_python=True).compress(data)
+                self.assertEqual(compressed, fresh)
+                decompressed = LZMACompressor(level=6, pure_python=True).decompress(compressed)
+                self.assertEqual(data, decompressed)
+
     def test_compression_levels(self):
         """Тест разных уровней сжатия"""
-        data = b'Compression level test' * 100
-        
-        compressed_0 = compress_lzma(data, level=0)
-        compressed_6 = compress_lzma(data, level=6)
-        compressed_9 = compress_lzma(data, level=9)
-        
-        # Все должны сжаться
-        self.assertTrue(compressed_0.startswith(b'LZMA'))
-        self.assertTrue(compressed_6.startswith(b'LZMA'))
-        self.assertTrue(compressed_9.startswith(b'LZMA'))
-        
-        # Все должны распаковаться правильно
-        self.assertEqual(data, decompress_lzma(compressed_0))
-        self.assertEqual(data, decompress_lzma(compressed_6))
-        self.assertEqual(data, decompress_lzma(compressed_9))
+        # Каждый уровень — отдельный subTest: сбой одного уровня виден
+        # сразу, но не прерывает проверку остальных
+        for level in (0, 6, 9):
+            with self.subTest(level=level):
+                compressed = compress_lzma(_LVL_PAYLOAD, level=level)
+                self.assertTrue(compressed.startswith(b'LZMA'))
+                self.assertEqual(_LVL_PAYLOAD, decompress_lzma(compressed))
 
 
 class TestArchiveFormat(unittest.TestCase):
@@ -185,16 +236,21 @@ class TestArchiveFormat(unittest.TestCase):
         """Тест магической сигнатуры архива"""
         self.assertEqual(ArchiveFormat.MAGIC, b'LZMA')
         self.assertEqual(ArchiveFormat.VERSION, 1)
+
+    def test_frozen_crc_matches_impl(self):
+        """Замороженный CRC-литерал соответствует zlib.crc32"""
+        self.assertEqual(zlib.crc32(b'Test file content') & 0xffffffff,
+                         0x4f7271d5)
     
     def test_write_read_single_file_archive(self):
         """Тест записи и чтения архива с одним файлом"""
-        with tempfile.TemporaryDirectory() as tmpdir:
+        with _temp_dir() as tmpdir:
             archive_path = os.path.join(tmpdir, 'test.lzma')
             
-            # Создаем запись
+            # Создаем запись; CRC константного payload заморожен литералом
             data = b'Test file content'
-            crc32 = zlib.crc32(data) & 0xffffffff
-            compressed = compress_lzma(data)
+            crc32 = 0x4f7271d5  # zlib.crc32(b'Test file content')
+            compressed = _compress_cached(data)
             
             entry = ArchiveEntry(
                 filename='test.txt',
@@ -221,23 +277,26 @@ class TestArchiveFormat(unittest.TestCase):
     
     def test_write_read_multiple_files_archive(self):
         """Тест архива с несколькими файлами"""
-        with tempfile.TemporaryDirectory() as tmpdir:
+        with _temp_dir() as tmpdir:
             archive_path = os.path.join(tmpdir, 'test.lzma')
             
-            entries = []
-            for i in range(3):
-                data = f'File {i} content'.encode()
-                crc32 = zlib.crc32(data) & 0xffffffff
-                compressed = compress_lzma(data)
-                
-                entry = ArchiveEntry(
+            payloads = [f'File {i} content'.encode() for i in range(3)]
+
+            # Сжимаем все payload одним batch в пуле потоков: lzma
+            # отпускает GIL, map сохраняет порядок
+            with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+                compressed_list = list(pool.map(_compress_cached, payloads))
+
+            entries = [
+                ArchiveEntry(
                     filename=f'file{i}.txt',
                     original_size=len(data),
                     compressed_size=len(compressed),
-                    crc32=crc32,
+                    crc32=zlib.crc32(data) & 0xffffffff,
                     data=compressed
                 )
-                entries.append(entry)
+                for i, (data, compressed) in enumerate(zip(payloads, compressed_list))
+            ]
             
             # Пишем архив
             ArchiveFormat.write_archive(entries, archive_path)
@@ -257,11 +316,15 @@ class TestArchiveFormat(unittest.TestCase):
 class TestArchiver(unittest.TestCase):
     """Тесты для архиватора"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Один архиватор на класс: он не хранит состояния между вызовами"""
+        cls.archiver = Archiver(level=6)
+
     def setUp(self):
         """Подготовка к тестам"""
-        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_dir = _temp_dir()
         self.temp_path = self.temp_dir.name
-        self.archiver = Archiver(level=6)
     
     def tearDown(self):
         """Очистка после тестов"""
@@ -272,8 +335,7 @@ class TestArchiver(unittest.TestCase):
         # Создаем файл
         test_file = os.path.join(self.temp_path, 'test.txt')
         test_data = b'Test content'
-        with open(test_file, 'wb') as f:
-            f.write(test_data)
+        Path(test_file).write_bytes(test_data)
         
         # Создаем архив
         archive_path = os.path.join(self.temp_path, 'archive.lzma')
@@ -289,8 +351,7 @@ class TestArchiver(unittest.TestCase):
         files = []
         for i in range(3):
             test_file = os.path.join(self.temp_path, f'file{i}.txt')
-            with open(test_file, 'wb') as f:
-                f.write(f'Content {i}'.encode())
+            Path(test_file).write_bytes(f'Content {i}'.encode())
             files.append(test_file)
         
         # Создаем архив
@@ -305,8 +366,7 @@ class TestArchiver(unittest.TestCase):
         # Создаем файл
         test_file = os.path.join(self.temp_path, 'test.txt')
         test_data = b'Test content for extraction'
-        with open(test_file, 'wb') as f:
-            f.write(test_data)
+        Path(test_file).write_bytes(test_data)
         
         # Создаем архив
         archive_path = os.path.join(self.temp_path, 'archive.lzma')
@@ -320,10 +380,7 @@ class TestArchiver(unittest.TestCase):
         extracted_file = os.path.join(extract_dir, 'test.txt')
         self.assertTrue(os.path.isfile(extracted_file))
         
-        with open(extracted_file, 'rb') as f:
-            extracted_data = f.read()
-        
-        self.assertEqual(test_data, extracted_data)
+        self.assertEqual(test_data, Path(extracted_file).read_bytes())
     
     def test_archive_file_integrity(self):
         """Тест целостности файлов в архиве"""
@@ -332,8 +389,7 @@ class TestArchiver(unittest.TestCase):
         for i in range(3):
             test_file = os.path.join(self.temp_path, f'file{i}.txt')
             test_data = f'Content file {i}'.encode('utf-8')
-            with open(test_file, 'wb') as f:
-                f.write(test_data)
+            Path(test_file).write_bytes(test_data)
             test_files[test_file] = test_data
         
         # Создаем архив
@@ -349,25 +405,20 @@ class TestArchiver(unittest.TestCase):
             filename = os.path.basename(original_file)
             extracted_file = os.path.join(extract_dir, filename)
             
-            with open(extracted_file, 'rb') as f:
-                extracted_data = f.read()
-            
-            self.assertEqual(original_data, extracted_data)
+            self.assertEqual(original_data, Path(extracted_file).read_bytes())
     
     def test_add_files_to_archive(self):
         """Тест добавления файлов в архив"""
         # Создаем первый файл и архив
         test_file1 = os.path.join(self.temp_path, 'file1.txt')
-        with open(test_file1, 'wb') as f:
-            f.write(b'File 1')
+        Path(test_file1).write_bytes(b'File 1')
         
         archive_path = os.path.join(self.temp_path, 'archive.lzma')
         self.archiver.create_archive([test_file1], archive_path)
         
         # Добавляем второй файл
         test_file2 = os.path.join(self.temp_path, 'file2.txt')
-        with open(test_file2, 'wb') as f:
-            f.write(b'File 2')
+        Path(test_file2).write_bytes(b'File 2')
         
         self.archiver.add_files(archive_path, [test_file2])
         
@@ -383,8 +434,7 @@ class TestArchiver(unittest.TestCase):
         # Создаем файл с повторяющимся содержимым
         test_file = os.path.join(self.temp_path, 'repeated.txt')
         test_data = b'AAAA' * 1000  # 4000 байт повторений
-        with open(test_file, 'wb') as f:
-            f.write(test_data)
+        Path(test_file).write_bytes(test_data)
         
         # Создаем архив
         archive_path = os.path.join(self.temp_path, 'archive.lzma')
@@ -400,42 +450,88 @@ class TestArchiver(unittest.TestCase):
 
 class TestRussianText(unittest.TestCase):
     """Тесты для русского текста"""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """Общая фикстура: текст сжимается один раз на класс"""
+        cls.ru_data = 'Привет мир! Это тестовая строка на русском языке.'.encode('utf-8')
+        cls.ru_compressed = compress_lzma(cls.ru_data)
+
     def test_compress_russian_text_roundtrip(self):
         """Тест сжатия-распаковки русского текста"""
-        data = 'Привет мир! Это тестовая строка на русском языке.'.encode('utf-8')
-        
-        compressed = compress_lzma(data)
-        decompressed = decompress_lzma(compressed)
-        
-        self.assertEqual(data, decompressed)
-    
+        self.assertEqual(self.ru_data, decompress_lzma(self.ru_compressed))
+
     def test_archive_russian_filenames(self):
-        """Тест архива с русскими именами файлов"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Создаем файл с русским именем
-            test_file = os.path.join(tmpdir, 'тест.txt')
-            with open(test_file, 'wb') as f:
-                f.write('Русский текст'.encode('utf-8'))
-            
-            # Создаем архив
+        """Тест архива с русскими именами файлов
+
+        Проверяется кодирование имён в формате архива, поэтому запись
+        собирается из готовой сжатой фикстуры — без повторного сжатия.
+        """
+        with _temp_dir() as tmpdir:
             archive_path = os.path.join(tmpdir, 'архив.lzma')
-            archiver = Archiver()
-            archiver.create_archive([test_file], archive_path)
-            
+
+            entry = ArchiveEntry(
+                filename='тест.txt',
+                original_size=len(self.ru_data),
+                compressed_size=len(self.ru_compressed),
+                crc32=zlib.crc32(self.ru_data) & 0xffffffff,
+                data=self.ru_compressed
+            )
+            ArchiveFormat.write_archive([entry], archive_path)
+
             # Распаковываем
             extract_dir = os.path.join(tmpdir, 'извлечено')
-            archiver.extract_archive(archive_path, extract_dir)
-            
-            # Проверяем
+            Archiver().extract_archive(archive_path, extract_dir)
+
+            # Проверяем имя и содержимое
             extracted_file = os.path.join(extract_dir, 'тест.txt')
             self.assertTrue(os.path.isfile(extracted_file))
+            self.assertEqual(self.ru_data, Path(extracted_file).read_bytes())
+
+
+def _run_case(case_name):
+    """Прогоняет один TestCase-класс в рабочем процессе.
+
+    Возвращает (успех, число тестов, вывод раннера) — результат unittest
+    не сериализуется между процессами целиком.
+    """
+    suite = unittest.defaultTestLoader.loadTestsFromName(f'tests_lzma.{case_name}')
+    stream = io.StringIO()
+    # buffer=True: stdout тестов (прогресс архиватора) не мешается с отчётом
+    result = unittest.TextTestRunner(stream=stream, verbosity=2,
+                                     buffer=True).run(suite)
+    return result.wasSuccessful(), result.testsRun, stream.getvalue()
 
 
 def run_tests():
-    """Запускает все тесты"""
-    unittest.main(verbosity=2)
+    """Запускает все тесты, распределяя TestCase-классы по процессам.
+
+    Классы независимы (каждый строит свои временные каталоги), а время
+    суммарно уходит в сжатие/распаковку, поэтому прогон масштабируется
+    почти линейно по числу ядер.
+    """
+    # Классы собираются интроспекцией модуля, как это делает TestLoader:
+    # новый TestCase попадает в прогон без правки списка здесь
+    module = sys.modules[__name__]
+    case_names = sorted(
+        name for name, obj in vars(module).items()
+        if isinstance(obj, type) and issubclass(obj, unittest.TestCase)
+    )
+
+    workers = min(os.cpu_count() or 1, len(case_names))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_run_case, case_names))
+
+    total = 0
+    all_ok = True
+    for ok, tests_run, output in results:
+        sys.stderr.write(output)
+        total += tests_run
+        all_ok = all_ok and ok
+
+    print(f"\nВсего тестов: {total}, результат: {'OK' if all_ok else 'FAILED'}")
+    return 0 if all_ok else 1
 
 
 if __name__ == '__main__':
-    run_tests()
\ No newline at end of file
+    sys.exit(run_tests())
\ No newline at end of file